@@ -1,11 +1,102 @@
-import tqdm.contrib.logging
+from __future__ import annotations
+
+import importlib
+import logging
+import typing
+
+import click
+
+if typing.TYPE_CHECKING:
+    from click.core import Context, HelpFormatter
+
+# subcommand name -> (import path, short help)
+# modules are imported only when the subcommand is invoked, so the startup
+# does not pay for bs4, lxml and friends
+SUBCOMMANDS = {
+    "cloudformation": (
+        "dashify.cloudformation:cloudformation",
+        "Convert CloudFormation documents to docsets.",
+    ),
+    "extract-sitemap-urls": (
+        "dashify.sitemap:extract_sitemap_urls",
+        "Extract URLs from sitemap.xml",
+    ),
+    "merge": (
+        "dashify.merge:merge",
+        "Merge built docsets into one docset.",
+    ),
+    "plain": (
+        "dashify.plain:plain",
+        "Convert downloaded HTML document to a docset.",
+    ),
+    "redshift": (
+        "dashify.redshift:redshift",
+        "Convert RedShift documents to docsets.",
+    ),
+    "verify": (
+        "dashify.verify:verify",
+        "Check links, images and index entries of a built docset.",
+    ),
+}
+
+
+class LazyGroup(click.Group):
+    """Click group that imports the subcommands on demand."""
+
+    def __init__(
+        self, *args, lazy_subcommands: dict[str, tuple[str, str]], **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands
+
+    def list_commands(self, ctx: Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
+
+    def get_command(self, ctx: Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands:
+            return self._load_command(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: Context, formatter: HelpFormatter) -> None:
+        # use the registered help text so listing commands does not import them
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_subcommands:
+                _, short_help = self.lazy_subcommands[name]
+            else:
+                cmd = super().get_command(ctx, name)
+                if cmd is None or cmd.hidden:
+                    continue
+                short_help = cmd.get_short_help_str()
+            rows.append((name, short_help))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+    def _load_command(self, cmd_name: str) -> click.Command:
+        import_path, _ = self.lazy_subcommands[cmd_name]
+        module_name, attr_name = import_path.split(":")
+        module = importlib.import_module(module_name)
+        return getattr(module, attr_name)
+
+
+@click.group("dashify", cls=LazyGroup, lazy_subcommands=SUBCOMMANDS)
+@click.option("-v", "--verbose", is_flag=True, help="Enables verbose mode.")
+def entry(verbose: bool):
+    """Entry point for dashify commands."""
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        format="%(asctime)s | %(levelname)s | %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=level,
+    )
+    # basicConfig is a no-op when `python -m dashify` has set up the tqdm handler
+    logging.getLogger().setLevel(level)
 
-import dashify.cloudformation
-import dashify.plain
-import dashify.redshift
-import dashify.sitemap
-from dashify.core import entry
 
 if __name__ == "__main__":
+    import tqdm.contrib.logging
+
     with tqdm.contrib.logging.logging_redirect_tqdm():
-        dashify.core.dashify_entry()
+        entry()
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import json
+import logging
+import typing
+import urllib.parse
+from pathlib import Path
+
+import dashify.core
+
+logger = logging.getLogger(__name__)
+
+# the first 3 breadcrumb items are always the same (AWS, Documentation, service)
+BREADCRUMB_SKIP = 3
+
+WILDCARD = "*"
+END = "$"
+
+LABEL_FALLBACK = "(fallback)"
+
+
+@dataclasses.dataclass(frozen=True)
+class RuleSet:
+    """Declarative rules to assign doc types.
+
+    Rules are checked in this order, and the first kind that matches wins:
+
+    ``titles``
+        Exact page title.
+    ``breadcrumbs``
+        Prefix of the breadcrumb, as paths relative to the site URL joined by
+        ``>``; e.g. ``cm_chap_SQLCommandRef.html > c_SQL_commands.html``.
+    ``stem_prefixes``
+        Prefix of the file name without suffix, compared as plain string.
+    ``stem_words``
+        Prefix of the dash-separated words in the file name without suffix;
+        e.g. ``aws-resource``.
+
+    In patterns, ``*`` matches any single item and a trailing ``$`` requires
+    the pattern to match the whole sequence. When several patterns of a kind
+    match, the longest one wins.
+    """
+
+    titles: dict[str, str] = dataclasses.field(default_factory=dict)
+    breadcrumbs: dict[str, str] = dataclasses.field(default_factory=dict)
+    stem_prefixes: dict[str, str] = dataclasses.field(default_factory=dict)
+    stem_words: dict[str, str] = dataclasses.field(default_factory=dict)
+    fallback: str = dashify.core.EntryType.Guide
+
+    @classmethod
+    def from_file(cls, path: Path) -> RuleSet:
+        """Load rules from a JSON file with the same keys as the fields.
+
+        Raises :py:exc:`ValueError` if the file is not valid rules.
+        """
+        with path.open() as fd:
+            data = json.load(fd)
+
+        if not isinstance(data, dict):
+            raise ValueError("rules must be a JSON object")
+
+        fields = {field.name for field in dataclasses.fields(cls)}
+        if unknown := data.keys() - fields:
+            raise ValueError(f"unknown keys: {', '.join(sorted(unknown))}")
+
+        def to_types(key: str) -> dict[str, str]:
+            rules = data.get(key, {})
+            if not isinstance(rules, dict) or not all(
+                isinstance(pattern, str) and isinstance(type_, str)
+                for pattern, type_ in rules.items()
+            ):
+                raise ValueError(f"'{key}' must map patterns to doc types")
+            return {
+                pattern: dashify.core.EntryType(type_)
+                for pattern, type_ in rules.items()
+            }
+
+        fallback = data.get("fallback", "Guide")
+        if not isinstance(fallback, str):
+            raise ValueError("'fallback' must be a doc type")
+
+        return cls(
+            titles=to_types("titles"),
+            breadcrumbs=to_types("breadcrumbs"),
+            stem_prefixes=to_types("stem_prefixes"),
+            stem_words=to_types("stem_words"),
+            fallback=dashify.core.EntryType(fallback),
+        )
+
+
+class Classifier:
+    """Rules compiled for a doc site.
+
+    It also counts how many pages each rule matched, see :py:meth:`report`.
+    """
+
+    def __init__(self, rules: RuleSet, site_url: str) -> None:
+        self.rules = rules
+        self.site_path = urllib.parse.urlsplit(site_url).path
+        self.stats: collections.Counter[str] = collections.Counter()
+
+        self.titles = {
+            title: (f"title: {title}", type_) for title, type_ in rules.titles.items()
+        }
+
+        self.breadcrumbs = PrefixTrie()
+        for pattern, type_ in rules.breadcrumbs.items():
+            tokens = pattern.replace(">", " ").split()
+            self.breadcrumbs.insert(tokens, (f"breadcrumb: {pattern}", type_))
+
+        self.stem_prefixes = PrefixTrie()
+        for pattern, type_ in rules.stem_prefixes.items():
+            self.stem_prefixes.insert(list(pattern), (f"stem prefix: {pattern}", type_))
+
+        self.stem_words = PrefixTrie()
+        for pattern, type_ in rules.stem_words.items():
+            self.stem_words.insert(
+                pattern.split("-"), (f"stem words: {pattern}", type_)
+            )
+
+    def classify(self, path: Path, metadata: dashify.core.DocMetadata) -> str:
+        """Get doc type of a page."""
+        label, type_ = self._match(path, metadata) or (
+            LABEL_FALLBACK,
+            self.rules.fallback,
+        )
+        self.stats[label] += 1
+        return type_
+
+    def _match(
+        self, path: Path, metadata: dashify.core.DocMetadata
+    ) -> tuple[str, str] | None:
+        if match := self.titles.get(metadata.title):
+            return match
+
+        if self.breadcrumbs:
+            nav = [
+                urllib.parse.urlsplit(url).path.removeprefix(self.site_path)
+                for url in metadata.breadcrumb_url[BREADCRUMB_SKIP:]
+            ]
+            if match := self.breadcrumbs.lookup(nav):
+                return match
+
+        if match := self.stem_prefixes.lookup(path.stem):
+            return match
+
+        if match := self.stem_words.lookup(path.stem.split("-")):
+            return match
+
+    def report(self):
+        """Log how many pages each rule matched."""
+        total = sum(self.stats.values())
+        logger.info("Doc type rules matched %d pages:", total)
+
+        labels = [label for label, _ in self.titles.values()]
+        labels += [f"breadcrumb: {p}" for p in self.rules.breadcrumbs]
+        labels += [f"stem prefix: {p}" for p in self.rules.stem_prefixes]
+        labels += [f"stem words: {p}" for p in self.rules.stem_words]
+        for label in labels:
+            logger.info("  %6d  %s", self.stats[label], label)
+
+        logger.info(
+            "  %6d  %s to %s",
+            self.stats[LABEL_FALLBACK],
+            LABEL_FALLBACK,
+            self.rules.fallback,
+        )
+
+
+class _TrieNode:
+    __slots__ = ("children", "value", "end_value")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.value = None
+        self.end_value = None
+
+
+class PrefixTrie:
+    """Trie that finds the value of the longest pattern matching a sequence."""
+
+    def __init__(self) -> None:
+        self.root = _TrieNode()
+        self.size = 0
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def insert(self, tokens: typing.Sequence[str], value):
+        exact = bool(tokens) and tokens[-1] == END
+        if exact:
+            tokens = tokens[:-1]
+
+        node = self.root
+        for token in tokens:
+            node = node.children.setdefault(token, _TrieNode())
+
+        if exact:
+            node.end_value = value
+        else:
+            node.value = value
+        self.size += 1
+
+    def lookup(self, tokens: typing.Sequence[str]):
+        """Return the value of the longest matching pattern. Exact matches win
+        over prefix matches of the same length, and literal tokens win over
+        wildcards."""
+        best = None
+        best_score = -1
+
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+
+            if node.value is not None and depth * 2 > best_score:
+                best, best_score = node.value, depth * 2
+
+            if depth == len(tokens):
+                if node.end_value is not None and depth * 2 + 1 > best_score:
+                    best, best_score = node.end_value, depth * 2 + 1
+                continue
+
+            # push wildcard first so the literal branch is visited first
+            if child := node.children.get(WILDCARD):
+                stack.append((child, depth + 1))
+            if child := node.children.get(tokens[depth]):
+                stack.append((child, depth + 1))
+
+        return best
@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import abc
+import concurrent.futures
 import copy
 import dataclasses
 import enum
 import functools
+import gzip
+import hashlib
+import io
 import json
 import logging
+import posixpath
+import queue
 import re
-import shutil
 import sqlite3
+import tarfile
+import tempfile
+import threading
 import typing
 import urllib.parse
 from contextlib import closing
@@ -22,19 +31,19 @@ import tqdm
 if typing.TYPE_CHECKING:
     from click.core import Context, Parameter
 
+    from dashify.classifier import RuleSet
+    from dashify.metrics import BuildMetrics
+
 logger = logging.getLogger(__name__)
 regex_ws = re.compile(r"\s+")
 
+# paths in the docset, see https://kapeli.com/docsets
+DOCUMENTS_DIR = "Contents/Resources/Documents"
+INDEX_PATH = "Contents/Resources/docSet.dsidx"
+INFO_PLIST_PATH = "Contents/Info.plist"
 
-@click.group("dashify")
-@click.option("-v", "--verbose", is_flag=True, help="Enables verbose mode.")
-def entry(verbose: bool):
-    """Entry point for dashify commands."""
-    logging.basicConfig(
-        format="%(asctime)s | %(levelname)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        level=logging.DEBUG if verbose else logging.INFO,
-    )
+T = typing.TypeVar("T")
+R = typing.TypeVar("R")
 
 
 class URL(click.ParamType):
@@ -49,29 +58,24 @@ class URL(click.ParamType):
         return value
 
 
-def prepare_docset(docset_path: Path):
-    """Prepare docset folder structure."""
-    current_dir = Path(__file__).resolve().parent
-
-    # normalize output path
+def normalize_docset_path(docset_path: Path) -> Path:
+    """Make sure the output path has `.docset` suffix."""
     if docset_path.suffix != ".docset":
         docset_path = docset_path.parent / f"{docset_path.name}.docset"
         logger.info(f"Output path is not a docset, using '{docset_path}'")
+    return docset_path
 
-    if docset_path.is_dir() and any(docset_path.iterdir()):
-        logger.error(f"Output directory '{docset_path}' is not empty")
-        raise click.Abort
 
-    # css
-    css_destination = docset_path / "Contents" / "Resources" / "Documents" / "Css"
-    css_destination.mkdir(parents=True, exist_ok=True)
+def prepare_docset(docset_path: Path):
+    """Prepare docset folder structure."""
+    docset_path = normalize_docset_path(docset_path)
+    check_output_dir(docset_path)
 
-    css_source = current_dir / "statics" / "css"
-    shutil.copy(css_source / "normalize.css", css_destination)
-    shutil.copy(css_source / "aws-doc-page.css", css_destination)
+    # css
+    copy_stylesheets(DirectorySink(docset_path))
 
     # images
-    images_destination = docset_path / "Contents" / "Resources" / "Documents" / "Images"
+    images_destination = docset_path / DOCUMENTS_DIR / "Images"
     images_destination.mkdir(parents=True, exist_ok=True)
 
     logger.debug("Docset folder structure created: %s", docset_path)
@@ -79,16 +83,81 @@ def prepare_docset(docset_path: Path):
     return docset_path
 
 
-def iter_document_files(site_url: str, root_dir: Path):
-    """Iterate over document files."""
+def check_output_dir(docset_path: Path):
+    if docset_path.is_dir() and any(docset_path.iterdir()):
+        logger.error(f"Output directory '{docset_path}' is not empty")
+        raise click.Abort
+
+
+def open_output(docset_path: Path, *, archive: bool = False) -> OutputSink:
+    """Open the output of a build: the docset directory, or with `archive` a
+    gzipped tarball of the docset, as served in Dash docset feeds."""
+    if not archive:
+        check_output_dir(docset_path)
+        return DirectorySink(docset_path)
+
+    archive_path = docset_path.with_suffix(".tgz")
+    if archive_path.exists():
+        logger.error(f"Output archive '{archive_path}' already exists")
+        raise click.Abort
+    return ArchiveSink(archive_path, prefix=docset_path.name)
+
+
+def copy_stylesheets(output: OutputSink):
+    css_source = Path(__file__).resolve().parent / "statics" / "css"
+    for name in ("normalize.css", "aws-doc-page.css"):
+        output.write(f"{DOCUMENTS_DIR}/Css/{name}", (css_source / name).read_bytes())
+
+
+@dataclasses.dataclass(frozen=True)
+class DocumentFile:
+    path: Path
+    size: int
+
+    @property
+    def cost(self) -> int:
+        """Estimated cost to convert this file. Parsing time is roughly linear
+        to the file size."""
+        return self.size
+
+
+def list_document_files(site_url: str, root_dir: Path) -> list[DocumentFile]:
+    """List document files, sorted by name so the builds are reproducible."""
     document_dir = root_dir / urllib.parse.urlsplit(site_url).path[1:]
     logger.debug("Document directory: %s", document_dir)
 
-    doc_files = list(document_dir.glob("*.html"))
-    logger.info("%d docs to be converted", len(doc_files))
+    return [
+        DocumentFile(path=path, size=path.stat().st_size)
+        for path in sorted(document_dir.glob("*.html"))
+    ]
+
 
-    for path in tqdm.tqdm(doc_files):
-        yield path
+def map_largest_first(
+    executor: concurrent.futures.Executor,
+    fn: typing.Callable[[T], R],
+    items: typing.Iterable[T],
+    *,
+    cost: typing.Callable[[T], int],
+    ordered: bool = False,
+) -> typing.Iterator[R]:
+    """Run `fn` over the items in the executor, most expensive items first.
+
+    All the tasks are submitted up front, sorted by descending `cost`, to the
+    executor's shared FIFO queue. Each worker takes the next pending task when
+    it is idle, so a few huge items never end up at the tail. Results are
+    yielded in completion order, or in the order of `items` if `ordered` is
+    set.
+    """
+    items = list(items)
+    by_cost = sorted(range(len(items)), key=lambda i: cost(items[i]), reverse=True)
+    futures = {i: executor.submit(fn, items[i]) for i in by_cost}
+
+    if ordered:
+        for i in range(len(items)):
+            yield futures[i].result()
+    else:
+        for future in concurrent.futures.as_completed(futures.values()):
+            yield future.result()
 
 
 @dataclasses.dataclass
@@ -98,6 +167,93 @@ class DocMetadata:
     breadcrumb_url: list[str]
 
 
+class MetadataCache:
+    """Per-page metadata of the last build.
+
+    The cache is persisted in the cache directory, one file per output
+    docset, so the index can be rebuilt with `--reindex-only` without
+    converting the HTML again.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.pages: dict[str, dict] = {}
+
+    @classmethod
+    def for_docset(cls, cache_dir: Path, docset_path: Path) -> MetadataCache:
+        key = hashlib.sha256(str(docset_path.resolve()).encode()).hexdigest()[:16]
+        return cls(cache_dir / "metadata" / f"{key}.json")
+
+    def add(self, doc_file: Path, metadata: DocMetadata):
+        self.pages[doc_file.name] = dataclasses.asdict(metadata)
+
+    def load(self):
+        if not self.path.is_file():
+            logger.error(f"Metadata cache '{self.path}' not found, build it first")
+            raise click.Abort
+        with self.path.open() as fd:
+            self.pages = json.load(fd)["pages"]
+        logger.debug("Loaded metadata of %d pages", len(self.pages))
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w") as fd:
+            json.dump({"pages": self.pages}, fd, ensure_ascii=False)
+        logger.debug("Saved metadata of %d pages to %s", len(self.pages), self.path)
+
+    def __iter__(self) -> typing.Iterator[tuple[Path, DocMetadata]]:
+        for name, record in sorted(self.pages.items()):
+            yield Path(name), DocMetadata(
+                title=record["title"],
+                breadcrumb_text=record["breadcrumb_text"],
+                breadcrumb_url=record["breadcrumb_url"],
+            )
+
+
+def reindex_docset(
+    docset_path: Path,
+    metadata_cache: MetadataCache,
+    get_doc_type: typing.Callable[[Path, DocMetadata], str],
+) -> list[dict[str, str]]:
+    """Rebuild `docSet.dsidx` of a built docset from the cached metadata.
+    Returns the index rows."""
+    docset_path = normalize_docset_path(docset_path)
+    db_path = docset_path / INDEX_PATH
+    if not db_path.parent.is_dir():
+        logger.error(f"Docset '{docset_path}' is not built yet")
+        raise click.Abort
+
+    metadata_cache.load()
+
+    document_dir = docset_path / "Contents" / "Resources" / "Documents"
+    indexes = []
+    missing = 0
+    for path, metadata in metadata_cache:
+        if not (document_dir / path).is_file():
+            logger.warning("Skip %s, page not found in the docset", path)
+            missing += 1
+            continue
+
+        indexes.append(
+            {
+                "name": metadata.title,
+                "type": get_doc_type(path, metadata),
+                "path": path.name,
+            }
+        )
+
+    create_docset_index(DirectorySink(docset_path), indexes)
+
+    logger.info("Reindexed %d pages in %s", len(indexes), docset_path)
+    if missing:
+        logger.warning(
+            "%d cached pages are not in the docset; rebuild it if this is unexpected",
+            missing,
+        )
+
+    return indexes
+
+
 def extract_metadata(soup: bs4.BeautifulSoup) -> DocMetadata | None:
     """Extract metadata from doc."""
     # title
@@ -126,13 +282,204 @@ def sanitize(s: str) -> str:
     return regex_ws.sub(" ", s)
 
 
+class OutputSink(abc.ABC):
+    """Target that receives the files of a docset.
+
+    Paths are POSIX paths relative to the docset directory.
+    """
+
+    @abc.abstractmethod
+    def write(self, path: str, data: bytes):
+        pass
+
+    def close(self):
+        pass
+
+
+class DirectorySink(OutputSink):
+    """Write files into a directory."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def __str__(self) -> str:
+        return str(self.root)
+
+    def write(self, path: str, data: bytes):
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        logger.debug("Write to %s", target)
+
+
+class ArchiveSink(OutputSink):
+    """Write files into a gzipped tarball, under the given prefix.
+
+    Every member and the gzip header get the same `mtime`, so the same input
+    always produces the same archive.
+    """
+
+    def __init__(self, archive_path: Path, prefix: str = "", mtime: int = 0) -> None:
+        self.archive_path = archive_path
+        self.gzip_file = gzip.GzipFile(archive_path, "wb", mtime=mtime)
+        self.archive = tarfile.open(fileobj=self.gzip_file, mode="w")
+        self.prefix = prefix
+        self.mtime = mtime
+
+    def __str__(self) -> str:
+        return str(self.archive_path)
+
+    def write(self, path: str, data: bytes):
+        info = tarfile.TarInfo(posixpath.join(self.prefix, path))
+        info.size = len(data)
+        info.mtime = self.mtime
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+        self.gzip_file.close()
+
+
+class MemorySink(OutputSink):
+    """Keep files in memory. Useful for testing and benchmarking."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+
+    def __str__(self) -> str:
+        return "memory"
+
+    def write(self, path: str, data: bytes):
+        self.files[path] = data
+
+
+class BackgroundWriter(OutputSink):
+    """Pass files to an :py:class:`OutputSink` in a background thread, so disk
+    I/O overlaps with converting the next page.
+
+    At most `max_pending` files are buffered; producers block when the buffer
+    is full. Errors raised in the writer thread are re-raised in the caller on
+    the next call or on :py:meth:`close`. :py:attr:`bytes_written` is final
+    once the writer is closed.
+    """
+
+    def __init__(self, sink: OutputSink, max_pending: int = 64) -> None:
+        self.sink = sink
+        self._queue: queue.Queue[tuple[str, Path | bytes] | None] = queue.Queue(
+            max_pending
+        )
+        self._copied: set[str] = set()
+        self._error: BaseException | None = None
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> BackgroundWriter:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, path: str, data: bytes):
+        """Queue data to be written to the path."""
+        self._put((path, data))
+
+    def copy(self, source: Path, path: str) -> bool:
+        """Queue a file to be copied to the path. Returns :py:obj:`False` when
+        the path is already copied."""
+        if path in self._copied:
+            return False
+        self._copied.add(path)
+        self._put((path, source))
+        return True
+
+    def close(self):
+        """Wait for pending files to be written and close the sink."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.sink.close()
+        self._raise_error()
+
+    def _put(self, item: tuple[str, Path | bytes]):
+        self._raise_error()
+        self._queue.put(item)
+
+    def _raise_error(self):
+        if self._error:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        while item := self._queue.get():
+            if self._error:
+                continue  # drain the queue so producers do not block
+            path, payload = item
+            try:
+                if isinstance(payload, Path):
+                    payload = payload.read_bytes()
+                self.sink.write(path, payload)
+                self.bytes_written += len(payload)
+            except BaseException as e:
+                self._error = e
+
+
+@dataclasses.dataclass
+class ConvertedPage:
+    """Output of :py:func:`convert_page`.
+
+    Pages are converted in worker processes; the files are written, and the
+    images copied, by the main process.
+    """
+
+    doc_file: DocumentFile
+    metadata: DocMetadata | None = None
+    files: dict[str, bytes] = dataclasses.field(default_factory=dict)
+    images: list[tuple[Path, str]] = dataclasses.field(default_factory=list)
+    counters: dict[str, int] = dataclasses.field(default_factory=dict)
+
+    def write(self, path: str, data: bytes):
+        self.files[path] = data
+
+    def copy(self, source: Path, path: str):
+        self.images.append((source, path))
+
+
+def convert_page(
+    doc_file: DocumentFile, *, root_dir: Path, site_url: str
+) -> ConvertedPage:
+    """Parse and convert a page. Runs in a worker process."""
+    import dashify.metrics
+
+    logger.debug("Convert %s", doc_file.path)
+    page = ConvertedPage(doc_file)
+    soup = bs4.BeautifulSoup(doc_file.path.read_text(), "lxml")
+
+    page.metadata = extract_metadata(soup)
+    if not page.metadata:
+        return page
+
+    metrics = dashify.metrics.BuildMetrics()
+    convert(
+        file_path=doc_file.path,
+        soup=soup,
+        root_dir=root_dir,
+        output=page,
+        site_url=site_url,
+        metrics=metrics,
+    )
+    page.counters = dict(metrics.counters)
+    return page
+
+
 def convert(
     *,
     file_path: Path,
     soup: bs4.BeautifulSoup,
     root_dir: Path,
-    docset_path: Path,
+    output: ConvertedPage,
     site_url: str,
+    metrics: BuildMetrics,
 ):
     """Clean up the HTML and convert it to Dash docset format."""
     # drop assets
@@ -154,17 +501,20 @@ def convert(
         target = get_alt_target(node["href"], site_url, root_dir)
         if isinstance(target, str):
             node["href"] = urllib.parse.urljoin(site_url, node["href"])
+            metrics.count("links_unresolved")
+        else:
+            metrics.count("links_resolved")
 
     # fix images
-    img_dir = docset_path / "Contents" / "Resources" / "Documents" / "Images"
     for node in soup.find_all("img"):
         target = get_alt_target(node["src"], site_url, root_dir)
         if isinstance(target, str):
             node["src"] = urllib.parse.urljoin(site_url, node["src"])
-        else:
-            node["src"] = f"Images/{target.name}"
-            shutil.copy(target, img_dir)
-            logger.debug("Copy %s to %s", target, img_dir / target.name)
+            metrics.count("images_unresolved")
+            continue
+
+        node["src"] = f"Images/{target.name}"
+        output.copy(target, f"Images/{target.name}")
 
     # fix icons
     for node in soup.find_all("awsui-icon"):
@@ -174,9 +524,7 @@ def convert(
             node.append(get_icon("alert"))
 
     # write to file
-    doc_path = docset_path / "Contents" / "Resources" / "Documents" / file_path.name
-    doc_path.write_text(str(soup))
-    logger.debug("Write to %s", doc_path)
+    output.write(file_path.name, str(soup).encode())
 
 
 def get_alt_target(path: str, site_url: str, root_dir: Path):
@@ -207,15 +555,23 @@ def _get_icon(name: str) -> bs4.Tag:
     return svg_tag
 
 
-def create_docset_index(docset_path: Path, indexes: list[dict[str, str]]):
+def create_docset_index(output: OutputSink, indexes: list[dict[str, str]]):
     """Create `docSet.dsidx` file."""
     logger.debug("Building docset index")
 
     sqlite3.paramstyle = "named"
 
-    db_path = docset_path / "Contents" / "Resources" / "docSet.dsidx"
-    db = sqlite3.connect(db_path)
+    # sqlite needs a real file, so the index is built in a temporary directory
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "docSet.dsidx"
+        with closing(sqlite3.connect(db_path)) as db:
+            _fill_docset_index(db, indexes)
+        output.write(INDEX_PATH, db_path.read_bytes())
+
+    logger.debug("Created docset index with %d rows", len(indexes))
+
 
+def _fill_docset_index(db: sqlite3.Connection, indexes: list[dict[str, str]]):
     # schema
     with closing(db.cursor()) as cur:
         cur.execute(
@@ -242,16 +598,15 @@ def create_docset_index(docset_path: Path, indexes: list[dict[str, str]]):
         )
 
     db.commit()
-    logger.debug(f"Created docset index: {db_path}")
 
 
-def copy_icons(icon_dir_name: str, docset_path: Path):
+def copy_icons(icon_dir_name: str, output: OutputSink):
     icon_dir = Path(__file__).resolve().parent / "statics" / icon_dir_name
-    shutil.copy(icon_dir / "icon.png", docset_path)
-    shutil.copy(icon_dir / "icon@2x.png", docset_path)
+    for name in ("icon.png", "icon@2x.png"):
+        output.write(name, (icon_dir / name).read_bytes())
 
 
-def create_info_plist(docset_path: Path, metadata: dict):
+def create_info_plist(output: OutputSink, metadata: dict):
     """Create Info.plist file."""
     # build tree
     info_plist = lxml.etree.Element("plist", version="1.0")
@@ -267,15 +622,260 @@ def create_info_plist(docset_path: Path, metadata: dict):
     tree = lxml.etree.ElementTree(info_plist)
 
     # output
-    info_plist_path = docset_path / "Contents" / "Info.plist"
-    with info_plist_path.open("wb") as fd:
+    with io.BytesIO() as fd:
         fd.write(
             b'<?xml version="1.0" encoding="UTF-8"?>\n'
             b'<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n'
         )
         tree.write(fd, pretty_print=True)
+        output.write(INFO_PLIST_PATH, fd.getvalue())
+
+    logger.debug("Created Info.plist file")
+
+
+@dataclasses.dataclass(frozen=True)
+class BuildOptions:
+    """Options shared by all the build commands. See :py:func:`build_options`."""
+
+    root_dir: Path
+    docset_path: Path
+    archive: bool
+    optimize_images: bool
+    max_image_width: int | None
+    cache_dir: Path
+    reindex_only: bool
+    jobs: int | None
+    metrics_jsonl: Path | None
+    metrics_prom: Path | None
+
+
+def build_options(func):
+    """Add the options shared by all the build commands. They are passed to the
+    command as one :py:class:`BuildOptions` in the `options` argument."""
+
+    @click.option(
+        "-r",
+        "--root-dir",
+        type=click.Path(file_okay=False, path_type=Path),
+        default="./docs.aws.amazon.com",
+        show_default=True,
+        help="Root directory that contains the downloaded docs",
+    )
+    @click.option(
+        "-d",
+        "--docset-path",
+        metavar="DOCSET",
+        type=click.Path(path_type=Path),
+        required=True,
+        help="Path to output docset",
+    )
+    @click.option(
+        "--archive",
+        is_flag=True,
+        help=(
+            "Write the docset as a gzipped tarball 'DOCSET.tgz', as served in "
+            "Dash docset feeds, instead of a directory"
+        ),
+    )
+    @click.option(
+        "--optimize-images",
+        is_flag=True,
+        help="Losslessly recompress the images in the docset",
+    )
+    @click.option(
+        "--max-image-width",
+        type=click.IntRange(min=1),
+        help="Downscale images wider than this width. Requires Pillow.",
+    )
+    @click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False, path_type=Path),
+        default="./.dashify-cache",
+        show_default=True,
+        help="Directory to store the build cache",
+    )
+    @click.option(
+        "--reindex-only",
+        is_flag=True,
+        help=(
+            "Only rebuild the index of an existing docset from the metadata "
+            "cached in the last build"
+        ),
+    )
+    @click.option(
+        "-j",
+        "--jobs",
+        type=click.IntRange(min=1),
+        help="Number of workers for parallel tasks. Default to the number of CPUs.",
+    )
+    @click.option(
+        "--metrics-jsonl",
+        type=click.Path(dir_okay=False, path_type=Path),
+        help="Append build metrics to this JSON-lines file",
+    )
+    @click.option(
+        "--metrics-prom",
+        type=click.Path(dir_okay=False, path_type=Path),
+        help="Write build metrics to this Prometheus textfile",
+    )
+    @functools.wraps(func)
+    def wrapper(**kwargs):
+        fields = [field.name for field in dataclasses.fields(BuildOptions)]
+        options = BuildOptions(**{name: kwargs.pop(name) for name in fields})
+        return func(options=options, **kwargs)
+
+    return wrapper
+
+
+def build_docset(
+    *,
+    name: str,
+    site_url: str,
+    options: BuildOptions,
+    rules: RuleSet,
+    info_plist: dict[str, str],
+    icon_dir_name: str | None = None,
+    sink: OutputSink | None = None,
+):
+    """Convert the downloaded docs of a guide to a docset.
+
+    This is the pipeline shared by all the build commands; each command only
+    provides the rules and metadata of its guide. Every file of the docset is
+    written to `sink`, which defaults to the output set in `options`.
+    """
+    import dashify.classifier
+    import dashify.images
+    import dashify.metrics
+
+    docset_path = normalize_docset_path(options.docset_path)
+    metadata_cache = MetadataCache.for_docset(options.cache_dir, docset_path)
+    classifier = dashify.classifier.Classifier(rules, site_url)
+
+    if options.reindex_only:
+        if options.archive:
+            logger.error("--reindex-only can not be used with --archive")
+            raise click.Abort
+        metrics = dashify.metrics.BuildMetrics(
+            identifier=info_plist["CFBundleIdentifier"], site_url=site_url
+        )
+        with metrics.stage("index"):
+            indexes = reindex_docset(docset_path, metadata_cache, classifier.classify)
+        metrics.count("pages_reindexed", len(indexes))
+        metrics.count_index(indexes)
+        classifier.report()
+        metrics.export(
+            jsonl_path=options.metrics_jsonl, prometheus_path=options.metrics_prom
+        )
+        return
+
+    root_dir = options.root_dir
+    if not root_dir.is_dir():
+        logger.error(f"Root directory '{root_dir}' does not exist")
+        raise click.Abort
+
+    if sink is None:
+        sink = open_output(docset_path, archive=options.archive)
+    logger.info(f"Convert {name} docs from '{root_dir}' to '{sink}'")
+
+    metrics = dashify.metrics.BuildMetrics(
+        identifier=info_plist["CFBundleIdentifier"], site_url=site_url
+    )
+
+    doc_files = list_document_files(site_url, root_dir)
+    logger.info("%d docs to be converted", len(doc_files))
+
+    optimize_images = options.optimize_images or options.max_image_width
+    images: dict[str, Path] = {}
+
+    with BackgroundWriter(sink) as output:
+        copy_stylesheets(output)
+
+        # pages are parsed in parallel, largest first, and the results are
+        # handled in name order so the output is the same on every run
+        with (
+            metrics.stage("convert"),
+            concurrent.futures.ProcessPoolExecutor(options.jobs) as executor,
+        ):
+            pages = map_largest_first(
+                executor,
+                functools.partial(convert_page, root_dir=root_dir, site_url=site_url),
+                doc_files,
+                cost=lambda doc_file: doc_file.cost,
+                ordered=True,
+            )
+
+            indexes = []
+            for page in tqdm.tqdm(pages, total=len(doc_files)):
+                doc_file = page.doc_file.path
+                metrics.count("bytes_read", page.doc_file.size)
+
+                metadata = page.metadata
+                if not metadata:
+                    logger.warning("No metadata found for %s", doc_file)
+                    metrics.count("pages_skipped")
+                    continue
+
+                # write converted doc; images are written by the image stage
+                # when they are to be optimized
+                for counter, value in page.counters.items():
+                    metrics.count(counter, value)
+                for path, data in page.files.items():
+                    output.write(f"{DOCUMENTS_DIR}/{path}", data)
+                for source, path in page.images:
+                    path = f"{DOCUMENTS_DIR}/{path}"
+                    if path in images:
+                        metrics.count("images_deduplicated")
+                        continue
+                    images[path] = source
+                    if not optimize_images:
+                        output.copy(source, path)
+                    metrics.count("images_copied")
+
+                metrics.count("pages_converted")
+                metadata_cache.add(doc_file, metadata)
+
+                # add to index
+                indexes.append(
+                    {
+                        "name": metadata.title,
+                        "type": classifier.classify(doc_file, metadata),
+                        "path": doc_file.name,
+                    }
+                )
+
+        metadata_cache.save()
+        classifier.report()
+
+        with metrics.stage("index"):
+            create_docset_index(output, indexes)
+        metrics.count_index(indexes)
+
+        if optimize_images:
+            with metrics.stage("images"):
+                results = dashify.images.optimize_images(
+                    images,
+                    output,
+                    cache_dir=options.cache_dir,
+                    max_width=options.max_image_width,
+                    jobs=options.jobs,
+                )
+            metrics.count(
+                "image_bytes_saved",
+                sum(r.original_size - r.optimized_size for r in results),
+            )
+
+        # finalise
+        create_info_plist(output, info_plist)
+        if icon_dir_name:
+            copy_icons(icon_dir_name, output)
+
+    metrics.count("bytes_written", output.bytes_written)
+    metrics.export(
+        jsonl_path=options.metrics_jsonl, prometheus_path=options.metrics_prom
+    )
 
-    logger.debug("Created Info.plist file: %s", info_plist_path)
+    # done
+    logger.info("Done! Docset created at %s", sink)
 
 
 class EntryType(enum.StrEnum):
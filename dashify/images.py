@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import functools
+import hashlib
+import io
+import logging
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+import click
+import tqdm
+
+import dashify.core
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+# ancillary chunks that affect how the image is rendered; others are dropped
+PNG_KEEP_CHUNKS = {
+    b"IHDR",
+    b"PLTE",
+    b"IEND",
+    b"tRNS",
+    b"gAMA",
+    b"cHRM",
+    b"sRGB",
+    b"iCCP",
+    b"sBIT",
+    b"pHYs",
+    b"acTL",
+    b"fcTL",
+    b"fdAT",
+}
+
+# markers that must be kept in JPEG: APP0 (JFIF), APP2 (ICC), APP14 (Adobe)
+JPEG_KEEP_MARKERS = {0xE0, 0xE2, 0xEE}
+
+JPEG_APP1 = 0xE1
+EXIF_ORIENTATION_TAG = 0x0112
+
+# quality to re-encode downscaled JPEG images; Pillow defaults to 75
+JPEG_QUALITY = 95
+
+# bump when the optimizer output changes, so stale cache entries are not used
+CACHE_VERSION = 3
+
+
+@dataclasses.dataclass
+class OptimizeResult:
+    path: Path
+    original_size: int
+    optimized_size: int
+    cached: bool
+
+
+def optimize_images(
+    images: dict[str, Path],
+    output: dashify.core.OutputSink,
+    *,
+    cache_dir: Path,
+    max_width: int | None = None,
+    jobs: int | None = None,
+) -> list[OptimizeResult]:
+    """Recompress images and write them to the output.
+
+    `images` maps the path in the output to the source image. Results are
+    cached by the hash of the source file, so unchanged images are never
+    processed twice across builds. Other image formats are written as-is.
+    """
+    if max_width:
+        _require_pillow()
+
+    image_cache_dir = cache_dir / "images"
+    image_cache_dir.mkdir(parents=True, exist_ok=True)
+
+    image_files = []
+    for path, source in sorted(images.items()):
+        if source.suffix.lower() in (".png", ".jpg", ".jpeg"):
+            image_files.append((path, source))
+        else:
+            output.write(path, source.read_bytes())
+    logger.info("%d images to be optimized", len(image_files))
+
+    # unlike process pools, thread pools default to more workers than CPUs
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(jobs or os.cpu_count()) as executor:
+        optimized = dashify.core.map_largest_first(
+            executor,
+            functools.partial(
+                optimize_image, cache_dir=image_cache_dir, max_width=max_width
+            ),
+            [source for _, source in image_files],
+            cost=lambda source: source.stat().st_size,
+            ordered=True,
+        )
+        for (path, _), (data, result) in tqdm.tqdm(
+            zip(image_files, optimized), total=len(image_files)
+        ):
+            output.write(path, data)
+            results.append(result)
+
+    original_size = sum(r.original_size for r in results)
+    optimized_size = sum(r.optimized_size for r in results)
+    logger.info(
+        "Optimized %d images (%d from cache), saved %d bytes (%d -> %d)",
+        len(results),
+        sum(r.cached for r in results),
+        original_size - optimized_size,
+        original_size,
+        optimized_size,
+    )
+
+    return results
+
+
+def optimize_image(
+    path: Path, *, cache_dir: Path, max_width: int | None = None
+) -> tuple[bytes, OptimizeResult]:
+    """Optimize single image. Returns the optimized data, or the source data if
+    it can not be made smaller."""
+    source = path.read_bytes()
+
+    digest = hashlib.sha256(source)
+    digest.update(f"version={CACHE_VERSION};max_width={max_width}".encode())
+    cache_path = cache_dir / f"{digest.hexdigest()}{path.suffix.lower()}"
+
+    output = _read_cache(cache_path)
+    cached = output is not None
+    if output is None:
+        try:
+            output = _optimize(source, path.suffix.lower(), max_width)
+        except Exception:
+            logger.warning("Failed to optimize image %s", path, exc_info=True)
+            output = source
+        if len(output) >= len(source) or not _is_image(output, path.suffix.lower()):
+            output = source
+        _write_cache(cache_path, output)
+
+    if output is not source:
+        logger.debug("Optimized %s: %d -> %d", path, len(source), len(output))
+
+    return output, OptimizeResult(
+        path=path,
+        original_size=len(source),
+        optimized_size=len(output),
+        cached=cached,
+    )
+
+
+def _read_cache(cache_path: Path) -> bytes | None:
+    """Read a cached image, or :py:obj:`None` if it is missing or corrupt."""
+    try:
+        data = cache_path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+    if not _is_image(data, cache_path.suffix):
+        logger.warning("Ignoring corrupt cache entry %s", cache_path)
+        return None
+    return data
+
+
+def _write_cache(cache_path: Path, data: bytes):
+    """Write a cache entry atomically, so concurrent readers never see a
+    partial file."""
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f"{cache_path.name}.", suffix=".tmp", dir=cache_path.parent
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, cache_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _is_image(data: bytes, suffix: str) -> bool:
+    """Check the signature and the end marker, which also catches truncation."""
+    if suffix == ".png":
+        return data.startswith(PNG_SIGNATURE) and data.endswith(PNG_IEND)
+    return data.startswith(b"\xff\xd8") and data.rstrip(b"\0").endswith(b"\xff\xd9")
+
+
+def _optimize(source: bytes, suffix: str, max_width: int | None) -> bytes:
+    if max_width:
+        source = _downscale(source, max_width)
+    if suffix == ".png":
+        return optimize_png(source)
+    return optimize_jpeg(source)
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Losslessly recompress PNG image data.
+
+    The image data is deflated again with the highest compression level, and
+    the chunks that do not affect rendering (text, timestamps, etc.) are dropped.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+
+    chunks = []
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos : pos + 4])
+        chunk_type = data[pos + 4 : pos + 8]
+        chunk_data = data[pos + 8 : pos + 8 + length]
+        pos += length + 12
+
+        if chunk_type == b"IDAT":
+            if not idat:
+                chunks.append((b"IDAT", None))  # placeholder
+            idat.append(chunk_data)
+        elif chunk_type in PNG_KEEP_CHUNKS:
+            chunks.append((chunk_type, chunk_data))
+
+        if chunk_type == b"IEND":
+            break
+
+    raw = zlib.decompress(b"".join(idat))
+    compressed = zlib.compress(raw, 9)
+
+    with io.BytesIO() as buf:
+        buf.write(PNG_SIGNATURE)
+        for chunk_type, chunk_data in chunks:
+            if chunk_data is None:
+                chunk_data = compressed
+            buf.write(struct.pack(">I", len(chunk_data)))
+            buf.write(chunk_type)
+            buf.write(chunk_data)
+            buf.write(struct.pack(">I", zlib.crc32(chunk_type + chunk_data)))
+        return buf.getvalue()
+
+
+def optimize_jpeg(data: bytes) -> bytes:
+    """Losslessly shrink JPEG image data by dropping metadata segments (EXIF,
+    XMP, comments). The compressed image data is kept as-is.
+
+    EXIF is kept if it rotates or flips the image, since browsers apply the
+    orientation tag when rendering.
+    """
+    if not data.startswith(b"\xff\xd8"):
+        raise ValueError("Not a JPEG file")
+
+    with io.BytesIO() as buf:
+        buf.write(b"\xff\xd8")
+        pos = 2
+        while pos < len(data):
+            if data[pos] != 0xFF:
+                raise ValueError("Invalid JPEG marker")
+            marker = data[pos + 1]
+            if marker == 0xFF:  # fill byte
+                pos += 1
+                continue
+            if marker == 0xDA:  # start of scan; rest is entropy-coded data
+                buf.write(data[pos:])
+                break
+
+            (length,) = struct.unpack(">H", data[pos + 2 : pos + 4])
+            segment = data[pos : pos + 2 + length]
+            pos += 2 + length
+
+            is_app = 0xE0 <= marker <= 0xEF
+            if marker == JPEG_APP1 and _exif_orientation(segment[4:]) not in (None, 1):
+                is_app = False  # keep the EXIF that orients the image
+            if marker == 0xFE or (is_app and marker not in JPEG_KEEP_MARKERS):
+                continue
+            buf.write(segment)
+
+        return buf.getvalue()
+
+
+def _exif_orientation(payload: bytes) -> int | None:
+    """Read the orientation tag from the payload of an APP1 segment, or
+    :py:obj:`None` if it is not EXIF or has no orientation."""
+    if not payload.startswith(b"Exif\0\0"):
+        return None
+    tiff = payload[6:]
+
+    match tiff[:4]:
+        case b"II*\0":
+            order = "<"
+        case b"MM\0*":
+            order = ">"
+        case _:
+            return None
+
+    try:
+        (ifd_offset,) = struct.unpack_from(f"{order}I", tiff, 4)
+        (count,) = struct.unpack_from(f"{order}H", tiff, ifd_offset)
+        for i in range(count):
+            tag, _, _, value = struct.unpack_from(
+                f"{order}HHIH", tiff, ifd_offset + 2 + i * 12
+            )
+            if tag == EXIF_ORIENTATION_TAG:
+                return value
+    except struct.error:
+        return None
+    return None
+
+
+def _downscale(data: bytes, max_width: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        # the EXIF orientation is not saved, so apply it to the pixels
+        oriented = ImageOps.exif_transpose(img)
+        if oriented.width <= max_width:
+            return data
+
+        height = round(oriented.height * max_width / oriented.width)
+        resized = oriented.resize((max_width, height), Image.Resampling.LANCZOS)
+
+        options = {"optimize": True, "icc_profile": img.info.get("icc_profile")}
+        if img.format == "JPEG":
+            options["quality"] = JPEG_QUALITY
+
+        with io.BytesIO() as buf:
+            resized.save(buf, format=img.format, **options)
+            return buf.getvalue()
+
+
+def _require_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        logger.error(
+            "Pillow is required for downscaling images; "
+            "install with `poetry install --extras images`"
+        )
+        raise click.Abort
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import plistlib
+import re
+import shutil
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import click
+import tqdm
+
+import dashify.core
+
+logger = logging.getLogger(__name__)
+
+regex_css_href = re.compile(r'href="Css/')
+regex_image_src = re.compile(r'src="Images/([^"]+)"')
+
+# directories shared by the guides in the merged docset
+RESERVED_NAMES = {"css", "images"}
+
+
+@click.command()
+@click.argument(
+    "sources",
+    metavar="SOURCE...",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option(
+    "-t",
+    "--title",
+    default="AWS Documentation",
+    show_default=True,
+    help="Docset title",
+)
+@click.option(
+    "-i",
+    "--identifier",
+    default="aws-docs",
+    show_default=True,
+    help="Docset identifier",
+)
+@click.option(
+    "-f",
+    "--family",
+    default="AWS",
+    show_default=True,
+    help="Platform family name for the docset",
+)
+@click.option(
+    "-d",
+    "--docset-path",
+    metavar="DOCSET",
+    type=click.Path(path_type=Path),
+    required=True,
+    help="Path to output docset",
+)
+def merge(
+    sources: tuple[Path, ...],
+    title: str,
+    identifier: str,
+    family: str,
+    docset_path: Path,
+):
+    """Merge built docsets into one docset.
+
+    Each source docset goes into its own subdirectory, named after the source.
+    Stylesheets and identical images are shared between the guides.
+    """
+    guides = {source.stem: source for source in sources}
+    if len(guides) != len(sources):
+        logger.error("Source docsets must have different names")
+        raise click.Abort
+
+    # check all the sources before writing anything
+    source_indexes = {}
+    for guide, source in guides.items():
+        if guide.lower() in RESERVED_NAMES:
+            logger.error(f"Source docset '{source}' can not be named '{guide}'")
+            raise click.Abort
+        if not (source / "Contents" / "Resources" / "Documents").is_dir():
+            logger.error(f"'{source}' is not a docset")
+            raise click.Abort
+        if not (source / "Contents" / "Resources" / "docSet.dsidx").is_file():
+            logger.error(f"'{source}' has no index, build it first")
+            raise click.Abort
+        try:
+            source_indexes[guide] = read_docset_index(source)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to read the index of '{source}': {e}")
+            raise click.Abort
+
+    docset_path = dashify.core.prepare_docset(docset_path)
+    logger.info(f"Merge {len(guides)} docsets to '{docset_path}'")
+
+    document_dir = docset_path / "Contents" / "Resources" / "Documents"
+    shared_images = SharedImages(document_dir / "Images")
+
+    indexes = []
+    for guide, source in guides.items():
+        source_document_dir = source / "Contents" / "Resources" / "Documents"
+        guide_dir = document_dir / guide
+        guide_dir.mkdir()
+
+        # images
+        image_names = {}
+        source_image_dir = source_document_dir / "Images"
+        if source_image_dir.is_dir():
+            for path in sorted(source_image_dir.iterdir()):
+                image_names[path.name] = shared_images.add(path)
+
+        # pages
+        pages = sorted(source_document_dir.glob("*.html"))
+        logger.info("Merging %d pages from %s", len(pages), source)
+        for path in tqdm.tqdm(pages):
+            content = path.read_text()
+            content = regex_css_href.sub('href="../Css/', content)
+            content = regex_image_src.sub(
+                lambda m: f'src="../Images/{image_names.get(m[1], m[1])}"', content
+            )
+            (guide_dir / path.name).write_text(content)
+
+        # index
+        for name, type_, path in source_indexes[guide]:
+            indexes.append({"name": name, "type": type_, "path": f"{guide}/{path}"})
+
+    output = dashify.core.DirectorySink(docset_path)
+    dashify.core.create_docset_index(output, indexes)
+
+    # finalise
+    metadata = {
+        "CFBundleIdentifier": identifier,
+        "CFBundleName": title,
+        "DocSetPlatformFamily": family,
+    }
+
+    first_guide, first_source = next(iter(guides.items()))
+    if index_page := read_info_plist(first_source).get("dashIndexFilePath"):
+        metadata["dashIndexFilePath"] = f"{first_guide}/{index_page}"
+
+    dashify.core.create_info_plist(output, metadata)
+
+    for icon_name in ("icon.png", "icon@2x.png"):
+        if (first_source / icon_name).is_file():
+            shutil.copy(first_source / icon_name, docset_path)
+
+    # report
+    source_size = sum(get_dir_size(source) for source in sources)
+    merged_size = get_dir_size(docset_path)
+    logger.info(
+        "Shared %d duplicated images; size %d bytes -> %d bytes",
+        shared_images.duplicates,
+        source_size,
+        merged_size,
+    )
+
+    # done
+    logger.info("Done! Docset created at %s", docset_path)
+
+
+class SharedImages:
+    """Image directory shared by all guides. Identical images are stored once."""
+
+    def __init__(self, image_dir: Path) -> None:
+        self.image_dir = image_dir
+        self.names_by_hash: dict[str, str] = {}
+        self.duplicates = 0
+
+    def add(self, path: Path) -> str:
+        """Add an image and return its name in the shared directory."""
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if name := self.names_by_hash.get(digest):
+            self.duplicates += 1
+            return name
+
+        name = path.name
+        if (self.image_dir / name).exists():
+            name = f"{path.stem}-{digest[:8]}{path.suffix}"
+
+        shutil.copy(path, self.image_dir / name)
+        self.names_by_hash[digest] = name
+        return name
+
+
+def read_docset_index(docset_path: Path) -> list[tuple[str, str, str]]:
+    db_path = docset_path / "Contents" / "Resources" / "docSet.dsidx"
+    # read-only, so a missing index is not created
+    db_uri = f"{db_path.resolve().as_uri()}?mode=ro"
+    with closing(sqlite3.connect(db_uri, uri=True)) as db:
+        return db.execute(
+            "SELECT name, type, path FROM searchIndex ORDER BY id"
+        ).fetchall()
+
+
+def read_info_plist(docset_path: Path) -> dict:
+    info_plist_path = docset_path / "Contents" / "Info.plist"
+    if not info_plist_path.is_file():
+        return {}
+    with info_plist_path.open("rb") as fd:
+        return plistlib.load(fd)
+
+
+def get_dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
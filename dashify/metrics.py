@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import json
+import logging
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class BuildMetrics:
+    """Collect throughput numbers of a build.
+
+    Counters are free-form names (e.g. ``pages_converted``); stage timings are
+    recorded with :py:meth:`stage`.
+    """
+
+    def __init__(self, **labels: str) -> None:
+        self.labels = labels
+        self.started_at = time.time()
+        self.counters: collections.Counter[str] = collections.Counter()
+        self.entry_types: collections.Counter[str] = collections.Counter()
+        self.timings: dict[str, float] = {}
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Measure the time spent in a build stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def count_index(self, indexes: list[dict[str, str]]):
+        """Count index rows by entry type."""
+        self.entry_types.update(str(item["type"]) for item in indexes)
+
+    @property
+    def pages_per_second(self) -> float:
+        elapsed = self.timings.get("convert")
+        if not elapsed:
+            return 0.0
+        return self.counters["pages_converted"] / elapsed
+
+    def as_dict(self) -> dict:
+        return {
+            "timestamp": self.started_at,
+            "labels": self.labels,
+            "counters": dict(sorted(self.counters.items())),
+            "pages_per_second": self.pages_per_second,
+            "index_rows": dict(sorted(self.entry_types.items())),
+            "stage_seconds": self.timings,
+        }
+
+    def write_jsonl(self, path: Path):
+        """Append the metrics as one line to a JSON-lines file."""
+        with path.open("a") as fd:
+            fd.write(json.dumps(self.as_dict(), ensure_ascii=False))
+            fd.write("\n")
+        logger.debug("Metrics appended to %s", path)
+
+    def write_prometheus(self, path: Path):
+        """Write the metrics in Prometheus textfile format.
+
+        The file is written to a temporary path first and then renamed, so the
+        node exporter never reads a partial file.
+        """
+        lines = []
+
+        def add(name: str, help: str, samples: list[tuple[dict[str, str], float]]):
+            lines.append(f"# HELP dashify_{name} {help}")
+            lines.append(f"# TYPE dashify_{name} gauge")
+            for extra_labels, value in samples:
+                labels = _format_labels({**self.labels, **extra_labels})
+                lines.append(f"dashify_{name}{labels} {value}")
+
+        add(
+            "build_timestamp_seconds",
+            "Unix time the build started.",
+            [({}, self.started_at)],
+        )
+        for name, value in sorted(self.counters.items()):
+            add(name, f"Number of {name.replace('_', ' ')}.", [({}, value)])
+        add(
+            "pages_per_second",
+            "Pages converted per second.",
+            [({}, self.pages_per_second)],
+        )
+        add(
+            "index_rows",
+            "Number of index rows by entry type.",
+            [({"type": k}, v) for k, v in sorted(self.entry_types.items())],
+        )
+        add(
+            "stage_seconds",
+            "Time spent in each build stage.",
+            [({"stage": k}, v) for k, v in self.timings.items()],
+        )
+
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text("\n".join(lines) + "\n")
+        tmp_path.replace(path)
+        logger.debug("Metrics written to %s", path)
+
+    def export(self, *, jsonl_path: Path | None, prometheus_path: Path | None):
+        if jsonl_path:
+            self.write_jsonl(jsonl_path)
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
@@ -5,15 +5,15 @@ import urllib.parse
 import uuid
 from pathlib import Path
 
-import bs4
 import click
 
+import dashify.classifier
 import dashify.core
 
 logger = logging.getLogger(__name__)
 
 
-@dashify.core.entry.command()
+@click.command()
 @click.option(
     "-t",
     "--title",
@@ -43,14 +43,6 @@ logger = logging.getLogger(__name__)
     required=True,
     help="URL of the document site. This is used to resolve file path and relative links.",
 )
-@click.option(
-    "-r",
-    "--root-dir",
-    type=click.Path(exists=True, file_okay=False, path_type=Path),
-    default="./docs.aws.amazon.com",
-    show_default=True,
-    help="Root directory that contains the downloaded docs",
-)
 @click.option(
     "-m",
     "--main-page",
@@ -58,60 +50,35 @@ logger = logging.getLogger(__name__)
     help="Path to the main page of the docset",
 )
 @click.option(
-    "-d",
-    "--docset-path",
-    metavar="DOCSET",
-    type=click.Path(path_type=Path),
-    required=True,
-    help="Path to output docset",
+    "--rules",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="JSON file of the rules to assign doc types. All pages are guides if not given.",
 )
+@dashify.core.build_options
 def plain(
     title: str,
     identifier: str,
     family: str,
     site_url: str,
-    root_dir: Path,
     main_page: Path,
-    docset_path: Path,
+    rules: Path | None,
+    options: dashify.core.BuildOptions,
 ):
-    """Convert downloaded HTML document to a docset without given the doc type
-    in index. This entry point is used for testing purpose."""
-    docset_path = dashify.core.prepare_docset(docset_path)
-    logger.info(f"Convert docs from '{root_dir}' to '{docset_path}'")
-
-    indexes = []
-    for doc_file in dashify.core.iter_document_files(site_url, root_dir):
-        logger.debug("Convert %s", doc_file)
-        soup = bs4.BeautifulSoup(doc_file.read_text(), "lxml")
+    """Convert downloaded HTML document to a docset.
 
-        # extract metadata
-        metadata = dashify.core.extract_metadata(soup)
-        if not metadata:
-            logger.warning("No metadata found for %s", doc_file)
-            continue
-
-        # convert doc
-        dashify.core.convert(
-            file_path=doc_file,
-            soup=soup,
-            root_dir=root_dir,
-            docset_path=docset_path,
-            site_url=site_url,
-        )
-
-        # add to index
-        indexes.append(
-            {
-                "name": metadata.title,
-                "type": dashify.core.EntryType.Guide,
-                "path": doc_file.name,
-            }
+    Doc types are assigned by the rules given in `--rules`, or all pages are
+    guides. This entry point is used for testing and new guides."""
+    try:
+        rule_set = (
+            dashify.classifier.RuleSet.from_file(rules)
+            if rules
+            else dashify.classifier.RuleSet()
         )
+    except ValueError as e:
+        logger.error(f"Invalid rules file '{rules}': {e}")
+        raise click.Abort
 
-    dashify.core.create_docset_index(docset_path, indexes)
-
-    # finalise
-    metadata = {
+    info_plist = {
         "CFBundleIdentifier": identifier,
         "CFBundleName": title,
         "DocSetPlatformFamily": family,
@@ -119,11 +86,14 @@ def plain(
     }
 
     if main_page:
-        site_base = root_dir / Path(urllib.parse.urlsplit(site_url).path[1:])
+        site_base = options.root_dir / Path(urllib.parse.urlsplit(site_url).path[1:])
         main_page_link = main_page.relative_to(site_base)
-        metadata["dashIndexFilePath"] = str(main_page_link)
-
-    dashify.core.create_info_plist(docset_path, metadata)
+        info_plist["dashIndexFilePath"] = str(main_page_link)
 
-    # done
-    logger.info("Done! Docset created at %s", docset_path)
+    dashify.core.build_docset(
+        name=title,
+        site_url=site_url,
+        options=options,
+        rules=rule_set,
+        info_plist=info_plist,
+    )
@@ -3,10 +3,8 @@ from __future__ import annotations
 import click
 import lxml.etree
 
-import dashify.core
 
-
-@dashify.core.entry.command()
+@click.command()
 @click.argument("sitemap", type=click.File("r"), default="-")
 def extract_sitemap_urls(sitemap: click.File):
     """Extract URLs from sitemap.xml"""
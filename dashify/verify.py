@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import functools
+import logging
+import posixpath
+import sqlite3
+import urllib.parse
+from contextlib import closing
+from pathlib import Path
+
+import click
+import lxml.html
+import tqdm
+
+import dashify.core
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class PageRefs:
+    path: str
+    anchors: set[str]
+    links: list[str]
+    images: list[str]
+
+
+@dataclasses.dataclass
+class Problem:
+    source: str
+    kind: str
+    target: str
+
+    def __str__(self) -> str:
+        return f"{self.source}: {self.kind} -> {self.target}"
+
+
+@click.command()
+@click.argument(
+    "docset_path",
+    metavar="DOCSET",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+@click.option(
+    "--check-anchors/--no-check-anchors",
+    default=True,
+    show_default=True,
+    help="Check that the fragment of local links exists in the target page",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Number of worker processes. Default to the number of CPUs.",
+)
+def verify(docset_path: Path, check_anchors: bool, jobs: int | None):
+    """Check links, images and index entries of a built docset."""
+    document_dir = docset_path / "Contents" / "Resources" / "Documents"
+    if not document_dir.is_dir():
+        logger.error("'%s' is not a docset", docset_path)
+        raise click.Abort
+
+    # index the docset once
+    files = {
+        path.relative_to(document_dir).as_posix()
+        for path in document_dir.rglob("*")
+        if path.is_file()
+    }
+    html_files = sorted(f for f in files if f.endswith(".html"))
+    logger.info(
+        "%d files in docset, %d pages to be checked", len(files), len(html_files)
+    )
+
+    pages: dict[str, PageRefs] = {}
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        for page in tqdm.tqdm(
+            dashify.core.map_largest_first(
+                executor,
+                functools.partial(collect_refs, document_dir=document_dir),
+                [document_dir / f for f in html_files],
+                cost=lambda path: path.stat().st_size,
+            ),
+            total=len(html_files),
+        ):
+            pages[page.path] = page
+
+    problems = check_pages(pages, files, check_anchors=check_anchors)
+    problems += check_search_index(docset_path, files)
+
+    for problem in problems:
+        logger.warning("%s", problem)
+
+    if problems:
+        logger.error("%d problems found in %s", len(problems), docset_path)
+        raise click.Abort
+
+    logger.info("No problem found in %s", docset_path)
+
+
+def collect_refs(path: Path, document_dir: Path) -> PageRefs:
+    """Collect anchors and local references of a page."""
+    tree = lxml.html.parse(path)
+
+    anchors = set(tree.xpath("//@id"))
+    anchors.update(tree.xpath("//a/@name"))
+
+    return PageRefs(
+        path=path.relative_to(document_dir).as_posix(),
+        anchors=anchors,
+        links=[str(href) for href in tree.xpath("//a/@href")],
+        images=[str(src) for src in tree.xpath("//img/@src | //link/@href")],
+    )
+
+
+def check_pages(
+    pages: dict[str, PageRefs], files: set[str], *, check_anchors: bool
+) -> list[Problem]:
+    problems = []
+    for path in sorted(pages):
+        page = pages[path]
+        for href in page.links:
+            target = resolve_local_ref(page.path, href)
+            if target is None:
+                continue
+
+            target_path, fragment = target
+            if target_path not in files:
+                problems.append(Problem(page.path, "broken link", href))
+            elif (
+                check_anchors
+                and fragment
+                and target_path in pages
+                and fragment not in pages[target_path].anchors
+            ):
+                problems.append(Problem(page.path, "missing anchor", href))
+
+        for src in page.images:
+            target = resolve_local_ref(page.path, src)
+            if target is None:
+                continue
+            if target[0] not in files:
+                problems.append(Problem(page.path, "missing asset", src))
+
+    return problems
+
+
+def check_search_index(docset_path: Path, files: set[str]) -> list[Problem]:
+    """Check that every `searchIndex` row points to an existing page."""
+    db_path = docset_path / "Contents" / "Resources" / "docSet.dsidx"
+    if not db_path.is_file():
+        return [Problem("docSet.dsidx", "missing index", str(db_path))]
+
+    problems = []
+    with closing(sqlite3.connect(db_path)) as db:
+        for name, path in db.execute("SELECT name, path FROM searchIndex ORDER BY id"):
+            # dash allows `<dash_entry_...>` tags and fragments in the path
+            path = path.split("#", 1)[0]
+            if path.startswith("<"):
+                path = path.rsplit(">", 1)[-1]
+            path = urllib.parse.unquote(path)
+            if path not in files:
+                problems.append(
+                    Problem("docSet.dsidx", "broken entry", f"{name} ({path})")
+                )
+
+    return problems
+
+
+def resolve_local_ref(page_path: str, ref: str) -> tuple[str, str] | None:
+    """Resolve a reference to (path, fragment) relative to the documents root.
+    Returns :py:obj:`None` for external references."""
+    parts = urllib.parse.urlsplit(ref)
+    if parts.scheme or parts.netloc:
+        return None
+
+    if not parts.path:
+        return page_path, parts.fragment
+
+    path = posixpath.normpath(
+        posixpath.join(posixpath.dirname(page_path), urllib.parse.unquote(parts.path))
+    )
+    return path, parts.fragment